@@ -229,12 +229,14 @@ class HTMLRenderer:
 
     # ====== 公共入口 ======
 
-    def render(self, document_ir: Dict[str, Any]) -> str:
+    def render(self, document_ir: Dict[str, Any], head_extra: str = "") -> str:
         """
         接收Document IR，重置内部状态并输出完整HTML。
 
         参数:
             document_ir: 由 DocumentComposer 生成的整本报告数据。
+            head_extra: 追加在</head>之前的额外片段（如PDF专用样式），
+                避免调用方事后对整份HTML做字符串替换。
 
         返回:
             str: 可直接写入磁盘的完整HTML文档。
@@ -272,7 +274,7 @@ class HTMLRenderer:
         hero_kpis = (metadata.get("hero") or {}).get("kpis")
         self.hero_kpi_signature = self._kpi_signature_from_items(hero_kpis)
 
-        head = self._render_head(title, theme_tokens)
+        head = self._render_head(title, theme_tokens, head_extra)
         body = self._render_body()
 
         # 输出图表验证统计
@@ -315,13 +317,14 @@ class HTMLRenderer:
             result["dark"] = self._resolve_color_value(value.get("dark") or value.get("darker"), result["dark"])
         return result
 
-    def _render_head(self, title: str, theme_tokens: Dict[str, Any]) -> str:
+    def _render_head(self, title: str, theme_tokens: Dict[str, Any], head_extra: str = "") -> str:
         """
         渲染<head>部分，加载主题CSS与必要的脚本依赖。
 
         参数:
             title: 页面title标签内容。
             theme_tokens: 主题变量，用于注入CSS。
+            head_extra: 追加在</head>之前的额外片段。
 
         返回:
             str: head片段HTML。
@@ -421,6 +424,7 @@ class HTMLRenderer:
     document.documentElement.classList.remove('no-js');
     document.documentElement.classList.add('js-ready');
   </script>
+{head_extra}
 </head>""".strip()
 
     def _render_body(self) -> str:
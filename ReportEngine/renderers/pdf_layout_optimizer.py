@@ -177,6 +177,8 @@ class PDFLayoutOptimizer:
         """
         self.config = config or self._create_default_config()
         self.optimization_log = []
+        # 最近一次optimize_for_document的日志条目，供调用方复用
+        self.last_log_entry: Optional[Dict[str, Any]] = None
 
     @staticmethod
     def _create_default_config() -> PDFLayoutConfig:
@@ -209,8 +211,8 @@ class PDFLayoutOptimizer:
         # 根据分析结果调整配置
         optimized_config = self._adjust_config_based_on_stats(stats)
 
-        # 记录优化日志
-        self._log_optimization(stats, optimized_config)
+        # 记录优化日志并保留日志条目，避免调用方为写日志再遍历一次文档
+        self.last_log_entry = self._log_optimization(stats, optimized_config)
 
         return optimized_config
 
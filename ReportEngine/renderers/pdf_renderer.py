@@ -7,10 +7,18 @@ from __future__ import annotations
 
 import base64
 import copy
+import functools
+import hashlib
 import os
 import sys
 import io
+import tempfile
+import threading
+import json
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
 from pathlib import Path
 from typing import Any, Dict
 from datetime import datetime
@@ -71,6 +79,12 @@ from .html_renderer import HTMLRenderer
 from .pdf_layout_optimizer import PDFLayoutOptimizer, PDFLayoutConfig
 from .chart_to_svg import create_chart_converter
 from .math_to_svg import MathToSVG
+try:
+    from fontTools.subset import Options as SubsetOptions, Subsetter
+    from fontTools.ttLib import TTFont
+    FONTTOOLS_AVAILABLE = True
+except ImportError:
+    FONTTOOLS_AVAILABLE = False
 try:
     from wordcloud import WordCloud
     WORDCLOUD_AVAILABLE = True
@@ -79,6 +93,588 @@ except ImportError:
     logger = logger  # ensure logger exists even before declaration
 
 
+# PDF专用样式模板，字体以本地文件URL引用
+_PDF_CSS_TEMPLATE = """
+<style>
+/* PDF专用字体 */
+@font-face {{
+    font-family: 'SourceHanSerif';
+    src: url('{font_url}') format('{font_format}');
+    font-weight: normal;
+    font-style: normal;
+}}
+
+/* 强制所有文本使用思源宋体 */
+body, h1, h2, h3, h4, h5, h6, p, li, td, th, div, span {{
+    font-family: 'SourceHanSerif', serif !important;
+}}
+
+/* PDF专用样式调整 */
+.report-header {{
+    display: none !important;
+}}
+
+.no-print {{
+    display: none !important;
+}}
+
+body {{
+    background: white !important;
+}}
+
+/* SVG图表容器样式 */
+.chart-svg-container {{
+    width: 100%;
+    height: auto;
+    display: flex;
+    justify-content: center;
+    align-items: center;
+}}
+
+.chart-svg-container svg {{
+    max-width: 100%;
+    height: auto;
+}}
+.chart-svg-container img {{
+    max-width: 100%;
+    height: auto;
+}}
+
+/* 数学公式SVG容器样式 */
+.math-svg-container {{
+    width: 100%;
+    height: auto;
+    display: flex;
+    justify-content: center;
+    align-items: center;
+    margin: 20px 0;
+}}
+
+.math-svg-container svg {{
+    max-width: 100%;
+    height: auto;
+}}
+
+/* 隐藏原始的math-block（因为已被SVG替换） */
+.math-block {{
+    display: none !important;
+}}
+
+/* 当对应SVG成功注入时隐藏fallback表格，失败时继续显示兜底数据 */
+.chart-fallback.svg-hidden {{
+    display: none !important;
+}}
+
+/* 确保chart-container显示（用于放置SVG） */
+.chart-container {{
+    display: block !important;
+    min-height: 400px;
+}}
+
+{optimized_css}
+</style>
+"""
+
+
+@functools.lru_cache(maxsize=8)
+def _build_pdf_css(font_path_str: str, optimized_css: str) -> str:
+    """
+    拼装PDF专用CSS
+
+    字体通过file:// URL引用，由WeasyPrint直接从磁盘加载并在输出PDF时自动子集化，
+    无需把数MB的字体以base64形式塞进HTML。
+    """
+    font_path = Path(font_path_str)
+    font_format = 'opentype' if font_path.suffix == '.otf' else 'truetype'
+    return _PDF_CSS_TEMPLATE.format(
+        font_url=font_path.resolve().as_uri(),
+        font_format=font_format,
+        optimized_css=optimized_css,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _get_font_path() -> Path:
+    """获取字体文件路径（结果在进程内缓存，字体文件运行期间不会变化）"""
+    # 优先使用完整字体以确保字符覆盖
+    fonts_dir = Path(__file__).parent / "assets" / "fonts"
+
+    # 检查完整字体
+    full_font = fonts_dir / "SourceHanSerifSC-Medium.otf"
+    if full_font.exists():
+        logger.info(f"使用完整字体: {full_font}")
+        return full_font
+
+    # 检查TTF子集字体
+    subset_ttf = fonts_dir / "SourceHanSerifSC-Medium-Subset.ttf"
+    if subset_ttf.exists():
+        logger.info(f"使用TTF子集字体: {subset_ttf}")
+        return subset_ttf
+
+    # 检查OTF子集字体
+    subset_otf = fonts_dir / "SourceHanSerifSC-Medium-Subset.otf"
+    if subset_otf.exists():
+        logger.info(f"使用OTF子集字体: {subset_otf}")
+        return subset_otf
+
+    raise FileNotFoundError(f"未找到字体文件，请检查 {fonts_dir} 目录")
+
+
+def _unique_tmp_path(path: Path) -> Path:
+    """生成与目标文件同目录的临时文件路径，进程号+线程号保证并发写入互不覆盖"""
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _evict_oldest_files(directory: Path, pattern: str, max_bytes: int) -> None:
+    """
+    目录内匹配pattern的文件总体积超出上限时，按修改时间从旧到新删除
+
+    参数:
+        directory: 缓存目录
+        pattern: 参与淘汰的文件glob模式
+        max_bytes: 总体积上限（字节）
+    """
+    try:
+        entries = []
+        for path in directory.glob(pattern):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+    except OSError:
+        return
+
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return
+
+    entries.sort(key=lambda entry: entry[0])
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+            total -= size
+        except OSError:
+            continue
+
+
+# 按文档生成的字体子集存放目录及其体积上限
+_FONT_SUBSET_DIR = Path(tempfile.gettempdir()) / 'bettafish_font_subsets'
+_FONT_SUBSET_MAX_BYTES = 100 * 1024 * 1024
+
+# 字体子集的固定字符表（页面固定文案、常用符号）
+_SUBSET_CHARS_FILE = Path(__file__).parent / "assets" / "fonts" / "pdf_subset_base_chars.txt"
+
+
+@functools.lru_cache(maxsize=1)
+def _base_subset_codepoints() -> frozenset:
+    """
+    字体子集的基础字符集，与文档内容无关
+
+    包括ASCII可打印字符、CJK标点、全角字符，以及pdf_subset_base_chars.txt中列出的固定字符
+    （目录、图表标题等页面固定文案）。
+    """
+    chars = {chr(code) for code in range(0x20, 0x7f)}
+    chars.update(chr(code) for code in range(0x3000, 0x3040))
+    chars.update(chr(code) for code in range(0xff00, 0xfff0))
+    try:
+        for line in _SUBSET_CHARS_FILE.read_text(encoding='utf-8').splitlines():
+            if not line.startswith('#'):
+                chars.update(ch for ch in line if not ch.isspace())
+    except OSError:
+        logger.warning(f"字体子集字符表缺失: {_SUBSET_CHARS_FILE}")
+    return frozenset(ord(ch) for ch in chars)
+
+
+def _collect_all_text(document_ir: Dict[str, Any]) -> set:
+    """遍历IR中所有字符串值，返回出现过的字符集合"""
+    chars: set = set()
+    stack: list = [document_ir]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            chars.update(node)
+        elif isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, (list, tuple)):
+            stack.extend(node)
+        elif node is not None:
+            chars.update(str(node))
+    return chars
+
+
+def _build_subset_font(document_ir: Dict[str, Any], font_path: Path) -> Path:
+    """
+    按文档实际用到的字符生成字体子集，返回子集字体路径
+
+    子集文件以字体文件与字符集的哈希命名，相同字符集的重复渲染直接复用；
+    子集目录总体积超出上限时按修改时间淘汰最久未使用的文件。
+    fontTools不可用或子集化失败时返回原字体路径。
+    """
+    if not FONTTOOLS_AVAILABLE:
+        return font_path
+
+    codepoints = sorted(_base_subset_codepoints() | {ord(ch) for ch in _collect_all_text(document_ir)})
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{font_path.resolve()}:{font_path.stat().st_mtime_ns}".encode('utf-8'))
+    digest.update(','.join(map(str, codepoints)).encode('ascii'))
+    subset_path = _FONT_SUBSET_DIR / f"subset_{digest.hexdigest()}{font_path.suffix}"
+    try:
+        # 命中时刷新修改时间以参与LRU淘汰
+        os.utime(subset_path)
+        return subset_path
+    except OSError:
+        pass
+
+    try:
+        options = SubsetOptions()
+        options.notdef_outline = True
+        subsetter = Subsetter(options=options)
+        subsetter.populate(unicodes=codepoints)
+        font = TTFont(str(font_path))
+        subsetter.subset(font)
+
+        _FONT_SUBSET_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = _unique_tmp_path(subset_path)
+        font.save(str(tmp_path))
+        font.close()
+        os.replace(tmp_path, subset_path)
+    except Exception as exc:
+        logger.warning(f"生成字体子集失败: {exc}，将使用完整字体")
+        return font_path
+
+    _evict_oldest_files(_FONT_SUBSET_DIR, f"subset_*{font_path.suffix}", _FONT_SUBSET_MAX_BYTES)
+
+    logger.info(f"已生成字体子集（{len(codepoints)} 个字符）: {subset_path}")
+    return subset_path
+
+
+# WeasyPrint write_pdf的默认体积/速度参数（WeasyPrint>=59）：
+# 重新压缩内嵌位图、限制JPEG质量与图片分辨率。批量导出时切勿开启uncompressed_pdf，
+# 否则PDF流不压缩、体积会成倍增长。
+DEFAULT_PDF_OPTIONS: Dict[str, Any] = {
+    'optimize_images': True,
+    'jpeg_quality': 85,
+    'dpi': 150,
+}
+
+# 图表数量低于该阈值时串行转换，避免进程池启动开销超过收益
+_PARALLEL_CHART_THRESHOLD = 4
+
+# 图表SVG的统一渲染尺寸
+_CHART_SVG_SIZE = {'width': 800, 'height': 500, 'dpi': 100}
+
+# 图表SVG磁盘缓存的默认体积上限
+_CHART_SVG_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# 进程池worker内的图表转换器，由_init_chart_worker在每个子进程中创建一次
+_worker_chart_converter = None
+
+# 进程内共享的图表渲染进程池（按需创建并跨渲染复用），及其对应的字体路径
+_chart_pool: ProcessPoolExecutor | None = None
+_chart_pool_font: str | None = None
+_chart_pool_lock = threading.Lock()
+
+
+def _init_chart_worker(font_path: str | None) -> None:
+    """进程池worker初始化：在子进程中创建图表转换器"""
+    global _worker_chart_converter
+    _worker_chart_converter = create_chart_converter(font_path=font_path)
+
+
+def _get_chart_pool(font_path: str | None) -> ProcessPoolExecutor:
+    """
+    获取进程内共享的图表渲染进程池
+
+    首次调用时创建，之后的渲染直接复用，worker只在启动时加载一次字体；
+    字体路径变化时重建进程池。
+    """
+    global _chart_pool, _chart_pool_font
+    with _chart_pool_lock:
+        if _chart_pool is None or _chart_pool_font != font_path:
+            if _chart_pool is not None:
+                _chart_pool.shutdown(wait=False, cancel_futures=True)
+            _chart_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                initializer=_init_chart_worker,
+                initargs=(font_path,)
+            )
+            _chart_pool_font = font_path
+        return _chart_pool
+
+
+def _discard_chart_pool() -> None:
+    """丢弃共享进程池（如worker异常退出导致进程池损坏），下次使用时重新创建"""
+    global _chart_pool, _chart_pool_font
+    with _chart_pool_lock:
+        if _chart_pool is not None:
+            _chart_pool.shutdown(wait=False, cancel_futures=True)
+        _chart_pool = None
+        _chart_pool_font = None
+
+
+def _render_widget(
+    item: tuple[str, Dict[str, Any]],
+    converter: Any = None
+) -> tuple[str, str | None]:
+    """
+    将单个图表widget渲染为SVG，返回(widgetId, SVG字符串或None)
+
+    定义在模块级别以便进程池序列化；未显式传入converter时使用worker内的转换器。
+    """
+    widget_id, block = item
+    converter = converter or _worker_chart_converter
+    try:
+        return widget_id, converter.convert_widget_to_svg(block, **_CHART_SVG_SIZE)
+    except Exception as e:
+        logger.error(f"转换图表 {widget_id} 时出错: {e}")
+        return widget_id, None
+
+
+# 遍历IR时缺省字段的默认值：迭代空元组无需每次新建空列表
+_EMPTY: tuple = ()
+
+
+def _collect_widget_blocks(document_ir: Dict[str, Any]) -> list[Dict[str, Any]]:
+    """
+    一次遍历IR，收集所有widget block，供图表与词云转换共享
+
+    使用显式栈代替递归，避免深层嵌套IR的函数调用开销与递归深度限制。
+
+    返回:
+        list[Dict[str, Any]]: 按遍历顺序收集的widget block列表
+    """
+    widgets: list[Dict[str, Any]] = []
+    stack = deque()
+    for chapter in document_ir.get('chapters') or _EMPTY:
+        stack.append(chapter.get('blocks') or _EMPTY)
+
+    while stack:
+        for block in stack.pop():
+            if not isinstance(block, dict):
+                continue
+
+            block_type = block.get('type')
+            if block_type == 'widget':
+                widgets.append(block)
+
+            # 嵌套的blocks入栈
+            nested_blocks = block.get('blocks')
+            if isinstance(nested_blocks, list):
+                stack.append(nested_blocks)
+
+            # 列表项入栈
+            if block_type == 'list':
+                for item in block.get('items') or _EMPTY:
+                    if isinstance(item, list):
+                        stack.append(item)
+
+            # 表格单元格入栈
+            elif block_type == 'table':
+                for row in block.get('rows') or _EMPTY:
+                    for cell in row.get('cells') or _EMPTY:
+                        cell_blocks = cell.get('blocks')
+                        if isinstance(cell_blocks, list):
+                            stack.append(cell_blocks)
+
+    return widgets
+
+
+def _strip_svg_prolog(svg_content: str) -> str:
+    """
+    去掉SVG开头的XML声明与DOCTYPE，便于直接嵌入HTML
+
+    matplotlib输出的序言总位于字符串开头，只检查前缀即可，无需正则扫描整段SVG。
+    """
+    svg_content = svg_content.lstrip()
+    if svg_content.startswith('<?xml'):
+        end = svg_content.find('?>')
+        if end != -1:
+            svg_content = svg_content[end + 2:].lstrip()
+    if svg_content.startswith('<!DOCTYPE'):
+        end = svg_content.find('>')
+        if end != -1:
+            svg_content = svg_content[end + 1:].lstrip()
+    return svg_content.rstrip()
+
+
+class _ChartMarkupScanner(HTMLParser):
+    """
+    单次遍历HTML，收集图表注入所需的位置信息
+
+    - canvases: data-config-id -> canvas元素在HTML中的(起始, 结束)偏移
+    - widget_configs: widgetId -> 配置脚本的id
+    - fallbacks: widgetId -> (起始, 结束, 原始开始标签) 的chart-fallback容器
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.canvases: Dict[str, tuple[int, int]] = {}
+        self.widget_configs: Dict[str, str] = {}
+        self.fallbacks: Dict[str, tuple[int, int, str]] = {}
+        self._html = ''
+        self._line_offsets: list[int] = [0]
+        self._canvas_start: tuple[int, str] | None = None
+        self._script_id: str | None = None
+        self._script_chunks: list[str] = []
+
+    def scan(self, html: str) -> None:
+        """扫描完整HTML文档"""
+        self._html = html
+        pos = html.find('\n')
+        while pos != -1:
+            self._line_offsets.append(pos + 1)
+            pos = html.find('\n', pos + 1)
+        self.feed(html)
+        self.close()
+
+    def _offset(self) -> int:
+        """将解析器当前的(行, 列)位置换算为字符串偏移"""
+        line, col = self.getpos()
+        return self._line_offsets[line - 1] + col
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == 'canvas':
+            config_id = dict(attrs).get('data-config-id')
+            if config_id:
+                self._canvas_start = (self._offset(), config_id)
+        elif tag == 'script':
+            self._script_id = dict(attrs).get('id')
+            self._script_chunks = []
+        elif tag == 'div':
+            attr_map = dict(attrs)
+            widget_id = attr_map.get('data-widget-id')
+            if widget_id and attr_map.get('class') == 'chart-fallback' and widget_id not in self.fallbacks:
+                start = self._offset()
+                tag_text = self.get_starttag_text() or ''
+                self.fallbacks[widget_id] = (start, start + len(tag_text), tag_text)
+
+    def handle_data(self, data: str) -> None:
+        if self._script_id:
+            self._script_chunks.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == 'canvas' and self._canvas_start:
+            start, config_id = self._canvas_start
+            self._canvas_start = None
+            end = self._html.find('>', self._offset()) + 1
+            self.canvases.setdefault(config_id, (start, end))
+        elif tag == 'script' and self._script_id:
+            content = ''.join(self._script_chunks)
+            if '"widgetId"' in content:
+                try:
+                    widget_id = json.loads(content).get('widgetId')
+                except (ValueError, AttributeError):
+                    widget_id = None
+                if widget_id:
+                    self.widget_configs.setdefault(widget_id, self._script_id)
+            self._script_id = None
+            self._script_chunks = []
+
+
+def _hide_fallback_edit(scanner: _ChartMarkupScanner, widget_id: str) -> tuple[int, int, str] | None:
+    """
+    生成将widget的chart-fallback标记为隐藏的编辑项，避免PDF中图表与表格重复出现
+
+    返回:
+        tuple[int, int, str] | None: (起始偏移, 结束偏移, 替换后的开始标签)，无需修改时返回None
+    """
+    fallback = scanner.fallbacks.get(widget_id)
+    if not fallback:
+        return None
+    fb_start, fb_end, tag = fallback
+    if 'svg-hidden' in tag:
+        return None
+    return fb_start, fb_end, tag.replace('chart-fallback"', 'chart-fallback svg-hidden"', 1)
+
+
+def _apply_edits(html: str, edits: list[tuple[int, int, str]]) -> str:
+    """按偏移一次性拼接所有替换片段，编辑区间互不重叠"""
+    if not edits:
+        return html
+    edits.sort(key=lambda edit: edit[0])
+    parts: list[str] = []
+    cursor = 0
+    for edit_start, edit_end, replacement in edits:
+        parts.append(html[cursor:edit_start])
+        parts.append(replacement)
+        cursor = edit_end
+    parts.append(html[cursor:])
+    return ''.join(parts)
+
+
+@functools.lru_cache(maxsize=1)
+def _chart_converter_version() -> str:
+    """图表转换器源码的哈希，作为SVG缓存键的一部分，转换逻辑修改后缓存自动失效"""
+    try:
+        source = Path(__file__).with_name('chart_to_svg.py').read_bytes()
+    except OSError:
+        return ''
+    return hashlib.blake2b(source, digest_size=8).hexdigest()
+
+
+class _ChartSVGDiskCache:
+    """
+    图表SVG的磁盘缓存
+
+    以图表block内容、渲染尺寸、转换器源码版本与字体路径的哈希为键，跨次渲染、
+    跨进程复用已生成的SVG；转换器代码或字体变化后旧条目自然失效。
+    缓存总体积超出上限时按文件修改时间淘汰最久未使用的条目。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        max_bytes: int = _CHART_SVG_CACHE_MAX_BYTES,
+        font_path: str | None = None
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.font_path = font_path
+
+    def make_key(self, block: Dict[str, Any]) -> str:
+        """根据图表block的稳定JSON表示及渲染环境计算缓存键"""
+        payload = json.dumps(
+            {
+                'block': block,
+                'size': _CHART_SVG_SIZE,
+                'converter': _chart_converter_version(),
+                'font': self.font_path,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.svg"
+
+    def get(self, key: str) -> str | None:
+        """读取缓存的SVG，命中时刷新修改时间以参与LRU淘汰"""
+        path = self._path_for(key)
+        try:
+            svg_content = path.read_text(encoding='utf-8')
+            os.utime(path)
+        except OSError:
+            return None
+        return svg_content or None
+
+    def put(self, key: str, svg_content: str) -> None:
+        """写入SVG；先写临时文件再原子替换，避免并发进程读到半截内容"""
+        path = self._path_for(key)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = _unique_tmp_path(path)
+            tmp_path.write_text(svg_content, encoding='utf-8')
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.debug(f"写入图表SVG缓存失败 {path}: {exc}")
+
+    def evict(self) -> None:
+        """缓存总体积超出上限时，按修改时间从旧到新删除条目"""
+        _evict_oldest_files(self.cache_dir, '*.svg', self.max_bytes)
+
+
 class PDFRenderer:
     """
     基于WeasyPrint的PDF渲染器
@@ -86,6 +682,9 @@ class PDFRenderer:
     - 直接从HTML生成PDF，保留所有CSS样式
     - 完美支持中文字体
     - 自动处理分页和布局
+
+    注意：字体文件不变时，同一实例在多次渲染间复用WeasyPrint的FontConfiguration以保留字体缓存，
+    而FontConfiguration不是线程安全的，因此实例不可跨线程并发使用，多线程请各自创建实例。
     """
 
     def __init__(
@@ -111,13 +710,28 @@ class PDFRenderer:
                 "WeasyPrint未安装，请运行: pip install weasyprint"
             )
 
+        # 字体配置按需创建，字体文件不变时跨渲染复用以保留WeasyPrint内部的字体度量缓存
+        self.font_config: FontConfiguration | None = None
+        self._font_config_path: str | None = None
+        # 最近一次_get_pdf_html引用的字体文件路径
+        self._pdf_font_path: str | None = None
+
         # 初始化图表转换器
         try:
-            font_path = self._get_font_path()
+            font_path = _get_font_path()
             self.chart_converter = create_chart_converter(font_path=str(font_path))
             logger.info("图表SVG转换器初始化成功")
         except Exception as e:
             logger.warning(f"图表SVG转换器初始化失败: {e}，将使用表格降级")
+            self.chart_converter = None
+
+        # 图表SVG磁盘缓存，需通过chart_svg_cache_dir显式指定目录才启用
+        cache_dir = self.config.get('chart_svg_cache_dir')
+        self.svg_cache = _ChartSVGDiskCache(
+            cache_dir,
+            self.config.get('chart_svg_cache_max_bytes', _CHART_SVG_CACHE_MAX_BYTES),
+            font_path=getattr(self.chart_converter, 'font_path', None)
+        ) if cache_dir else None
 
         # 初始化数学公式转换器
         try:
@@ -127,32 +741,6 @@ class PDFRenderer:
             logger.warning(f"数学公式SVG转换器初始化失败: {e}，公式将显示为文本")
             self.math_converter = None
 
-    @staticmethod
-    def _get_font_path() -> Path:
-        """获取字体文件路径"""
-        # 优先使用完整字体以确保字符覆盖
-        fonts_dir = Path(__file__).parent / "assets" / "fonts"
-
-        # 检查完整字体
-        full_font = fonts_dir / "SourceHanSerifSC-Medium.otf"
-        if full_font.exists():
-            logger.info(f"使用完整字体: {full_font}")
-            return full_font
-
-        # 检查TTF子集字体
-        subset_ttf = fonts_dir / "SourceHanSerifSC-Medium-Subset.ttf"
-        if subset_ttf.exists():
-            logger.info(f"使用TTF子集字体: {subset_ttf}")
-            return subset_ttf
-
-        # 检查OTF子集字体
-        subset_otf = fonts_dir / "SourceHanSerifSC-Medium-Subset.otf"
-        if subset_otf.exists():
-            logger.info(f"使用OTF子集字体: {subset_otf}")
-            return subset_otf
-
-        raise FileNotFoundError(f"未找到字体文件，请检查 {fonts_dir} 目录")
-
     def _preprocess_charts(self, document_ir: Dict[str, Any]) -> Dict[str, Any]:
         """
         预处理图表：验证和修复所有图表数据
@@ -262,177 +850,187 @@ class PDFRenderer:
 
         return ir_copy
 
-    def _convert_charts_to_svg(self, document_ir: Dict[str, Any]) -> Dict[str, str]:
+    def _convert_charts_to_svg(
+        self,
+        document_ir: Dict[str, Any],
+        widget_blocks: list[Dict[str, Any]] | None = None
+    ) -> Dict[str, str]:
         """
         将document_ir中的所有图表转换为SVG
 
+        先从widget列表中筛选待转换的图表，再统一渲染；开启parallel_charts且图表较多时使用进程池并行渲染。
+
         参数:
             document_ir: Document IR数据
+            widget_blocks: _collect_widget_blocks收集的widget列表（可选，缺省时现场遍历）
 
         返回:
             Dict[str, str]: widgetId到SVG字符串的映射
         """
-        svg_map = {}
-
-        if not hasattr(self, 'chart_converter') or not self.chart_converter:
+        # 转换器不可用时直接返回，不再遍历整份IR
+        if getattr(self, 'chart_converter', None) is None:
             logger.warning("图表转换器未初始化，跳过图表转换")
-            return svg_map
+            return {}
 
-        # 遍历所有章节
-        chapters = document_ir.get('chapters', [])
-        for chapter in chapters:
-            blocks = chapter.get('blocks', [])
-            self._extract_and_convert_widgets(blocks, svg_map)
+        if widget_blocks is None:
+            widget_blocks = _collect_widget_blocks(document_ir)
+        widget_list = self._collect_chart_widgets(widget_blocks)
+
+        svg_map = self._render_chart_widgets(widget_list)
 
         logger.info(f"成功转换 {len(svg_map)} 个图表为SVG")
         return svg_map
 
-    def _convert_wordclouds_to_images(self, document_ir: Dict[str, Any]) -> Dict[str, str]:
+    def _render_chart_widgets(
+        self,
+        widget_list: list[tuple[str, Dict[str, Any]]]
+    ) -> Dict[str, str]:
         """
-        将document_ir中的词云widget转换为PNG并返回data URI映射
+        将收集到的图表渲染为SVG
+
+        内容未变化的图表直接从磁盘缓存读取；配置parallel_charts=True且图表数量达到阈值时
+        分发到进程内共享的进程池并行渲染，否则（或进程池不可用时）串行渲染。
+
+        参数:
+            widget_list: (widgetId, widget block) 列表
+
+        返回:
+            Dict[str, str]: widgetId到SVG字符串的映射
         """
-        img_map: Dict[str, str] = {}
+        svg_map: Dict[str, str] = {}
+        cache_keys: Dict[str, str] = {}
+        svg_cache = getattr(self, 'svg_cache', None)
+
+        if svg_cache:
+            pending = []
+            for widget_id, block in widget_list:
+                key = svg_cache.make_key(block)
+                cached = svg_cache.get(key)
+                if cached:
+                    svg_map[widget_id] = cached
+                else:
+                    cache_keys[widget_id] = key
+                    pending.append((widget_id, block))
+            if svg_map:
+                logger.debug(f"图表SVG缓存命中 {len(svg_map)} 个，待渲染 {len(pending)} 个")
+            widget_list = pending
 
-        if not WORDCLOUD_AVAILABLE:
-            logger.debug("wordcloud库未安装，词云将使用表格兜底")
-            return img_map
+        results: list[tuple[str, str | None]] = []
 
-        # 遍历所有章节
-        chapters = document_ir.get('chapters', [])
-        for chapter in chapters:
-            blocks = chapter.get('blocks', [])
-            self._extract_wordcloud_widgets(blocks, img_map)
+        # 并行渲染需显式开启：在多线程服务中fork子进程有死锁风险，spawn平台则每个worker都要重新导入依赖
+        if self.config.get('parallel_charts', False) and len(widget_list) >= _PARALLEL_CHART_THRESHOLD:
+            try:
+                pool = _get_chart_pool(getattr(self.chart_converter, 'font_path', None))
+                results = list(pool.map(_render_widget, widget_list))
+                logger.debug(f"使用共享进程池并行转换 {len(widget_list)} 个图表")
+            except Exception as exc:
+                logger.warning(f"并行转换图表失败: {exc}，改为串行转换")
+                _discard_chart_pool()
+                results = []
+
+        if not results:
+            results = [_render_widget(item, self.chart_converter) for item in widget_list]
+
+        failed_widgets: list[str] = []
+        for widget_id, svg_content in results:
+            if svg_content:
+                svg_map[widget_id] = svg_content
+                if widget_id in cache_keys:
+                    svg_cache.put(cache_keys[widget_id], svg_content)
+            else:
+                failed_widgets.append(widget_id)
+        if failed_widgets:
+            logger.warning(f"{len(failed_widgets)} 个图表转换为SVG失败: {failed_widgets[:5]}")
 
-        if img_map:
-            logger.info(f"成功转换 {len(img_map)} 个词云为图片")
-        return img_map
+        if cache_keys:
+            svg_cache.evict()
+        return svg_map
 
-    def _extract_and_convert_widgets(
+    def _convert_wordclouds_to_images(
         self,
-        blocks: list,
-        svg_map: Dict[str, str]
-    ) -> None:
+        document_ir: Dict[str, Any],
+        widget_blocks: list[Dict[str, Any]] | None = None
+    ) -> Dict[str, str]:
         """
-        递归遍历blocks，找到所有widget并转换为SVG
+        将document_ir中的词云widget转换为PNG并返回data URI映射
 
         参数:
-            blocks: block列表
-            svg_map: 用于存储转换结果的字典
+            document_ir: Document IR数据
+            widget_blocks: _collect_widget_blocks收集的widget列表（可选，缺省时现场遍历）
         """
-        for block in blocks:
-            if not isinstance(block, dict):
-                continue
+        img_map: Dict[str, str] = {}
 
-            block_type = block.get('type')
+        if not WORDCLOUD_AVAILABLE:
+            logger.debug("wordcloud库未安装，词云将使用表格兜底")
+            return img_map
 
-            # 处理widget类型
-            if block_type == 'widget':
-                widget_id = block.get('widgetId')
-                widget_type = block.get('widgetType', '')
-
-                # 只处理chart.js类型的widget
-                if widget_id and widget_type.startswith('chart.js'):
-                    widget_type_lower = widget_type.lower()
-                    props = block.get('props')
-                    props_type = str(props.get('type') or '').lower() if isinstance(props, dict) else ''
-                    if 'wordcloud' in widget_type_lower or 'wordcloud' in props_type:
-                        logger.debug(f"检测到词云 {widget_id}，跳过SVG转换并使用图片注入流程")
-                        continue
+        if widget_blocks is None:
+            widget_blocks = _collect_widget_blocks(document_ir)
 
-                    failed, fail_reason = self.html_renderer._has_chart_failure(block)
-                    if block.get("_chart_renderable") is False or failed:
-                        logger.debug(
-                            f"跳过转换失败的图表 {widget_id}"
-                            f"{f'，原因: {fail_reason}' if fail_reason else ''}"
-                        )
-                        continue
-                    try:
-                        svg_content = self.chart_converter.convert_widget_to_svg(
-                            block,
-                            width=800,
-                            height=500,
-                            dpi=100
-                        )
-                        if svg_content:
-                            svg_map[widget_id] = svg_content
-                            logger.debug(f"图表 {widget_id} 转换为SVG成功")
-                        else:
-                            logger.warning(f"图表 {widget_id} 转换为SVG失败")
-                    except Exception as e:
-                        logger.error(f"转换图表 {widget_id} 时出错: {e}")
+        for block in widget_blocks:
+            widget_id = block.get('widgetId')
+            widget_type = block.get('widgetType')
 
-            # 递归处理嵌套的blocks
-            nested_blocks = block.get('blocks')
-            if isinstance(nested_blocks, list):
-                self._extract_and_convert_widgets(nested_blocks, svg_map)
+            props = block.get('props')
+            props_type = str(props.get('type') or '') if isinstance(props, dict) else ''
+            is_wordcloud = (
+                isinstance(widget_type, str) and 'wordcloud' in widget_type.lower()
+            ) or ('wordcloud' in props_type.lower())
 
-            # 处理列表项
-            if block_type == 'list':
-                items = block.get('items', [])
-                for item in items:
-                    if isinstance(item, list):
-                        self._extract_and_convert_widgets(item, svg_map)
+            if widget_id and is_wordcloud:
+                try:
+                    data_uri = self._generate_wordcloud_image(block)
+                    if data_uri:
+                        img_map[widget_id] = data_uri
+                        logger.debug(f"词云 {widget_id} 转换为图片成功")
+                except Exception as exc:
+                    logger.warning(f"生成词云图片失败 {widget_id}: {exc}")
 
-            # 处理表格单元格
-            if block_type == 'table':
-                rows = block.get('rows', [])
-                for row in rows:
-                    cells = row.get('cells', [])
-                    for cell in cells:
-                        cell_blocks = cell.get('blocks', [])
-                        if isinstance(cell_blocks, list):
-                            self._extract_and_convert_widgets(cell_blocks, svg_map)
+        if img_map:
+            logger.info(f"成功转换 {len(img_map)} 个词云为图片")
+        return img_map
 
-    def _extract_wordcloud_widgets(
-        self,
-        blocks: list,
-        img_map: Dict[str, str]
-    ) -> None:
-        """
-        递归遍历blocks，找到词云widget并生成图片
+    def _collect_chart_widgets(self, widgets: list) -> list[tuple[str, Dict[str, Any]]]:
         """
-        for block in blocks:
-            if not isinstance(block, dict):
-                continue
+        从widget列表中筛选需要转换为SVG的chart.js图表（不做渲染）
 
-            block_type = block.get('type')
-            if block_type == 'widget':
-                widget_id = block.get('widgetId')
-                widget_type = block.get('widgetType', '')
+        跳过词云（走图片注入流程）与已知修复失败的图表。
 
-                props = block.get('props')
-                props_type = str(props.get('type') or '') if isinstance(props, dict) else ''
-                is_wordcloud = (
-                    isinstance(widget_type, str) and 'wordcloud' in widget_type.lower()
-                ) or ('wordcloud' in props_type.lower())
+        参数:
+            widgets: _collect_widget_blocks收集到的widget block列表
 
-                if widget_id and is_wordcloud:
-                    try:
-                        data_uri = self._generate_wordcloud_image(block)
-                        if data_uri:
-                            img_map[widget_id] = data_uri
-                            logger.debug(f"词云 {widget_id} 转换为图片成功")
-                    except Exception as exc:
-                        logger.warning(f"生成词云图片失败 {widget_id}: {exc}")
+        返回:
+            list[tuple[str, Dict[str, Any]]]: (widgetId, block) 列表
+        """
+        widget_list: list[tuple[str, Dict[str, Any]]] = []
+        wordcloud_count = 0
+        skipped_failed: list[str] = []
+        for block in widgets:
+            widget_id = block.get('widgetId')
+            widget_type = block.get('widgetType')
+
+            # 只处理chart.js类型的widget
+            if not (widget_id and widget_type and widget_type.startswith('chart.js')):
+                continue
 
-            nested_blocks = block.get('blocks')
-            if isinstance(nested_blocks, list):
-                self._extract_wordcloud_widgets(nested_blocks, img_map)
+            widget_type_lower = widget_type.lower()
+            props = block.get('props')
+            props_type = str(props.get('type') or '').lower() if isinstance(props, dict) else ''
+            if 'wordcloud' in widget_type_lower or 'wordcloud' in props_type:
+                wordcloud_count += 1
+                continue
 
-            if block_type == 'list':
-                items = block.get('items', [])
-                for item in items:
-                    if isinstance(item, list):
-                        self._extract_wordcloud_widgets(item, img_map)
+            failed, _ = self.html_renderer._has_chart_failure(block)
+            if block.get("_chart_renderable") is False or failed:
+                skipped_failed.append(widget_id)
+                continue
+            widget_list.append((widget_id, block))
 
-            if block_type == 'table':
-                rows = block.get('rows', [])
-                for row in rows:
-                    cells = row.get('cells', [])
-                    for cell in cells:
-                        cell_blocks = cell.get('blocks', [])
-                        if isinstance(cell_blocks, list):
-                            self._extract_wordcloud_widgets(cell_blocks, img_map)
+        if wordcloud_count:
+            logger.debug(f"检测到 {wordcloud_count} 个词云，跳过SVG转换并使用图片注入流程")
+        if skipped_failed:
+            logger.debug(f"跳过 {len(skipped_failed)} 个修复失败的图表: {skipped_failed[:5]}")
+        return widget_list
 
     def _normalize_wordcloud_items(self, block: Dict[str, Any]) -> list:
         """
@@ -476,7 +1074,7 @@ class PDFRenderer:
             freq = weight * 100 if 0 < weight <= 1.5 else weight
             frequencies[item['word']] = max(1, freq)
 
-        font_path = str(self._get_font_path())
+        font_path = str(_get_font_path())
         wc = WordCloud(
             width=1000,
             height=360,
@@ -665,6 +1263,9 @@ class PDFRenderer:
         """
         将SVG内容直接注入到HTML中（不使用JavaScript）
 
+        只对HTML做一次前向扫描，收集配置脚本、canvas和fallback的位置后一次性拼接，
+        避免按图表数量重复用正则扫描整份文档。
+
         参数:
             html: 原始HTML内容
             svg_map: widgetId到SVG内容的映射
@@ -675,51 +1276,50 @@ class PDFRenderer:
         if not svg_map:
             return html
 
-        import re
+        scanner = _ChartMarkupScanner()
+        scanner.scan(html)
 
-        # 为每个widgetId查找对应的canvas并替换为SVG
+        # (起始偏移, 结束偏移, 替换内容)
+        edits: list[tuple[int, int, str]] = []
+        # 日志汇总输出，避免大量图表时逐条格式化
+        missing_config: list[str] = []
+        missing_canvas: list[str] = []
+        replaced = 0
         for widget_id, svg_content in svg_map.items():
             # 清理SVG内容（移除XML声明，因为SVG将嵌入HTML）
-            svg_content = re.sub(r'<\?xml[^>]+\?>', '', svg_content)
-            svg_content = re.sub(r'<!DOCTYPE[^>]+>', '', svg_content)
-            svg_content = svg_content.strip()
+            svg_content = _strip_svg_prolog(svg_content)
 
             # 创建SVG容器HTML
             svg_html = f'<div class="chart-svg-container">{svg_content}</div>'
 
-            # 查找包含此widgetId的配置脚本（限制在同一个</script>内，避免跨标签误配）
-            config_pattern = rf'<script[^>]+id="([^"]+)"[^>]*>(?:(?!</script>).)*?"widgetId"\s*:\s*"{re.escape(widget_id)}"(?:(?!</script>).)*?</script>'
-            match = re.search(config_pattern, html, re.DOTALL)
-
-            if match:
-                config_id = match.group(1)
-
-                # 查找对应的canvas元素
-                # 格式: <canvas id="chart-N" data-config-id="chart-config-N"></canvas>
-                canvas_pattern = rf'<canvas[^>]+data-config-id="{re.escape(config_id)}"[^>]*></canvas>'
-
-                # 【修复】替换canvas为SVG，使用lambda避免反斜杠转义问题
-                html, replaced = re.subn(canvas_pattern, lambda m: svg_html, html, count=1)
-                if replaced:
-                    logger.debug(f"已替换图表 {widget_id} 的canvas为SVG")
-                else:
-                    logger.warning(f"未找到图表 {widget_id} 的canvas进行替换")
+            # 查找包含此widgetId的配置脚本
+            config_id = scanner.widget_configs.get(widget_id)
+            if not config_id:
+                missing_config.append(widget_id)
+                continue
 
-                # 将对应fallback标记为隐藏，避免PDF中出现重复表格
-                fallback_pattern = rf'<div class="chart-fallback"([^>]*data-widget-id="{re.escape(widget_id)}"[^>]*)>'
+            # 查找对应的canvas元素
+            # 格式: <canvas id="chart-N" data-config-id="chart-config-N"></canvas>
+            canvas_span = scanner.canvases.get(config_id)
+            if canvas_span:
+                edits.append((canvas_span[0], canvas_span[1], svg_html))
+                replaced += 1
+            else:
+                missing_canvas.append(widget_id)
 
-                def _hide_fallback(m: re.Match) -> str:
-                    """为匹配到的图表fallback添加隐藏类，防止PDF中重复渲染"""
-                    tag = m.group(0)
-                    if 'svg-hidden' in tag:
-                        return tag
-                    return tag.replace('chart-fallback"', 'chart-fallback svg-hidden"', 1)
+            # 将对应fallback标记为隐藏，避免PDF中出现重复表格
+            fallback_edit = _hide_fallback_edit(scanner, widget_id)
+            if fallback_edit:
+                edits.append(fallback_edit)
 
-                html = re.sub(fallback_pattern, _hide_fallback, html, count=1)
-            else:
-                logger.warning(f"未找到图表 {widget_id} 对应的配置脚本")
+        if replaced:
+            logger.debug(f"已替换 {replaced} 个图表canvas为SVG")
+        if missing_config:
+            logger.warning(f"未找到 {len(missing_config)} 个图表对应的配置脚本: {missing_config[:5]}")
+        if missing_canvas:
+            logger.warning(f"未找到 {len(missing_canvas)} 个图表的canvas进行替换: {missing_canvas[:5]}")
 
-        return html
+        return _apply_edits(html, edits)
 
     @staticmethod
     def _normalize_latex(raw: Any) -> str:
@@ -792,46 +1392,59 @@ class PDFRenderer:
     def _inject_wordcloud_images(self, html: str, img_map: Dict[str, str]) -> str:
         """
         将词云PNG data URI注入HTML，替换对应canvas
+
+        与SVG注入共用_ChartMarkupScanner：一次扫描拿到配置脚本、canvas与fallback的位置
+        （widgetId已按JSON与HTML属性解码），再按偏移一次性拼接。
+
+        参数:
+            html: 原始HTML内容
+            img_map: widgetId到PNG data URI的映射
+
+        返回:
+            str: 注入词云图片后的HTML
         """
         if not img_map:
             return html
 
-        import re
+        scanner = _ChartMarkupScanner()
+        scanner.scan(html)
 
+        edits: list[tuple[int, int, str]] = []
+        missing_config: list[str] = []
+        missing_canvas: list[str] = []
+        replaced = 0
         for widget_id, data_uri in img_map.items():
-            img_html = (
-                f'<div class="chart-svg-container wordcloud-img">'
-                f'<img src="{data_uri}" alt="词云" />'
-                f'</div>'
-            )
-
-            config_pattern = rf'<script[^>]+id="([^"]+)"[^>]*>(?:(?!</script>).)*?"widgetId"\s*:\s*"{re.escape(widget_id)}"(?:(?!</script>).)*?</script>'
-            match = re.search(config_pattern, html, re.DOTALL)
-            if not match:
-                logger.debug(f"未找到词云 {widget_id} 的配置脚本，跳过注入")
+            config_id = scanner.widget_configs.get(widget_id)
+            if not config_id:
+                missing_config.append(widget_id)
                 continue
 
-            config_id = match.group(1)
-            canvas_pattern = rf'<canvas[^>]+data-config-id="{re.escape(config_id)}"[^>]*></canvas>'
-
-            html, replaced = re.subn(canvas_pattern, lambda m: img_html, html, count=1)
-            if replaced:
-                logger.debug(f"已替换词云 {widget_id} 的canvas为PNG图片")
+            canvas_span = scanner.canvases.get(config_id)
+            if canvas_span:
+                edits.append((
+                    canvas_span[0],
+                    canvas_span[1],
+                    f'<div class="chart-svg-container wordcloud-img">'
+                    f'<img src="{data_uri}" alt="词云" />'
+                    f'</div>'
+                ))
+                replaced += 1
             else:
-                logger.warning(f"未找到词云 {widget_id} 的canvas进行替换")
+                missing_canvas.append(widget_id)
 
-            fallback_pattern = rf'<div class="chart-fallback"([^>]*data-widget-id="{re.escape(widget_id)}"[^>]*)>'
+            # 隐藏表格兜底，避免图片与表格重复显示
+            fallback_edit = _hide_fallback_edit(scanner, widget_id)
+            if fallback_edit:
+                edits.append(fallback_edit)
 
-            def _hide_fallback(m: re.Match) -> str:
-                """匹配词云表格兜底并打上隐藏标记，避免SVG/图片重复显示"""
-                tag = m.group(0)
-                if 'svg-hidden' in tag:
-                    return tag
-                return tag.replace('chart-fallback"', 'chart-fallback svg-hidden"', 1)
+        if replaced:
+            logger.debug(f"已替换 {replaced} 个词云canvas为PNG图片")
+        if missing_config:
+            logger.debug(f"未找到 {len(missing_config)} 个词云的配置脚本，跳过注入: {missing_config[:5]}")
+        if missing_canvas:
+            logger.warning(f"未找到 {len(missing_canvas)} 个词云的canvas进行替换: {missing_canvas[:5]}")
 
-            html = re.sub(fallback_pattern, _hide_fallback, html, count=1)
-
-        return html
+        return _apply_edits(html, edits)
 
     def _inject_math_svg_into_html(self, html: str, svg_map: Dict[str, str]) -> str:
         """
@@ -852,9 +1465,7 @@ class PDFRenderer:
         # 优先替换内联公式，再替换块级公式，保持顺序一致
         for math_id, svg_content in svg_map.items():
             # 清理SVG内容（移除XML声明，因为SVG将嵌入HTML）
-            svg_content = re.sub(r'<\?xml[^>]+\?>', '', svg_content)
-            svg_content = re.sub(r'<!DOCTYPE[^>]+>', '', svg_content)
-            svg_content = svg_content.strip()
+            svg_content = _strip_svg_prolog(svg_content)
 
             svg_block_html = f'<div class="math-svg-container">{svg_content}</div>'
             svg_inline_html = f'<span class="math-svg-inline">{svg_content}</span>'
@@ -889,20 +1500,22 @@ class PDFRenderer:
     def _get_pdf_html(
         self,
         document_ir: Dict[str, Any],
-        optimize_layout: bool = True
+        optimize_layout: bool = True,
+        save_layout_log: bool = False
     ) -> str:
         """
         生成适用于PDF的HTML内容
 
         - 移除交互式元素（按钮、导航等）
         - 添加PDF专用样式
-        - 嵌入字体文件
+        - 引用本地字体文件
         - 应用布局优化
         - 将图表转换为SVG矢量图形
 
         参数:
             document_ir: Document IR数据
             optimize_layout: 是否启用布局优化
+            save_layout_log: 是否将布局优化日志写入logs/pdf_layouts（默认False）
 
         返回:
             str: 优化后的HTML内容
@@ -911,40 +1524,47 @@ class PDFRenderer:
         if optimize_layout:
             logger.info("启用PDF布局优化...")
             layout_config = self.layout_optimizer.optimize_for_document(document_ir)
+            self.layout_optimizer.config = layout_config
 
-            # 保存优化日志
-            log_dir = Path('logs/pdf_layouts')
-            log_dir.mkdir(parents=True, exist_ok=True)
-            log_file = log_dir / f"layout_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            if save_layout_log:
+                # 保存配置和优化日志
+                log_dir = Path('logs/pdf_layouts')
+                log_file = log_dir / f"layout_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+                self.layout_optimizer.save_config(log_file, self.layout_optimizer.last_log_entry)
 
-            # 保存配置和优化日志
-            optimization_log = self.layout_optimizer._log_optimization(
-                self.layout_optimizer._analyze_document(document_ir),
-                layout_config
-            )
-            self.layout_optimizer.config = layout_config
-            self.layout_optimizer.save_config(log_file, optimization_log)
-        else:
-            layout_config = self.layout_optimizer.config
+        optimized_css = self.layout_optimizer.generate_pdf_css()
 
         # 关键修复：先预处理图表，确保数据有效
         logger.info("预处理图表数据...")
         preprocessed_ir = self._preprocess_charts(document_ir)
 
+        # 一次遍历收集widget，供图表与词云转换共享
+        widget_blocks = _collect_widget_blocks(preprocessed_ir)
+
         # 转换图表为SVG（使用预处理后的IR）
         logger.info("开始转换图表为SVG矢量图形...")
-        svg_map = self._convert_charts_to_svg(preprocessed_ir)
+        svg_map = self._convert_charts_to_svg(preprocessed_ir, widget_blocks)
 
         # 转换词云为PNG
         logger.info("开始转换词云为图片...")
-        wordcloud_map = self._convert_wordclouds_to_images(preprocessed_ir)
+        wordcloud_map = self._convert_wordclouds_to_images(preprocessed_ir, widget_blocks)
 
         # 转换数学公式为SVG
         logger.info("开始转换数学公式为SVG矢量图形...")
         math_svg_map = self._convert_math_to_svg(preprocessed_ir)
 
+        # 获取字体路径（以file:// URL引用，不再内嵌base64），开启subset_font时按文档用字生成子集
+        font_path = _get_font_path()
+        if self.config.get('subset_font', False):
+            font_path = _build_subset_font(preprocessed_ir, font_path)
+
+        self._pdf_font_path = str(font_path)
+
+        # PDF专用CSS直接由HTML渲染器写入</head>之前，无需事后替换整份HTML
+        pdf_css = _build_pdf_css(self._pdf_font_path, optimized_css)
+
         # 使用HTML渲染器生成基础HTML（使用预处理后的IR，以便复用mathId等标记）
-        html = self.html_renderer.render(preprocessed_ir)
+        html = self.html_renderer.render(preprocessed_ir, head_extra=pdf_css)
 
         # 注入图表SVG
         if svg_map:
@@ -960,109 +1580,72 @@ class PDFRenderer:
             html = self._inject_math_svg_into_html(html, math_svg_map)
             logger.info(f"已注入 {len(math_svg_map)} 个SVG公式")
 
-        # 获取字体路径并转换为base64（用于嵌入）
-        font_path = self._get_font_path()
-        font_data = font_path.read_bytes()
-        font_base64 = base64.b64encode(font_data).decode('ascii')
-
-        # 判断字体格式
-        font_format = 'opentype' if font_path.suffix == '.otf' else 'truetype'
-
-        # 生成优化后的CSS
-        optimized_css = self.layout_optimizer.generate_pdf_css()
-
-        # 添加PDF专用CSS
-        pdf_css = f"""
-<style>
-/* PDF专用字体嵌入 */
-@font-face {{
-    font-family: 'SourceHanSerif';
-    src: url(data:font/{font_format};base64,{font_base64}) format('{font_format}');
-    font-weight: normal;
-    font-style: normal;
-}}
-
-/* 强制所有文本使用思源宋体 */
-body, h1, h2, h3, h4, h5, h6, p, li, td, th, div, span {{
-    font-family: 'SourceHanSerif', serif !important;
-}}
-
-/* PDF专用样式调整 */
-.report-header {{
-    display: none !important;
-}}
-
-.no-print {{
-    display: none !important;
-}}
-
-body {{
-    background: white !important;
-}}
-
-/* SVG图表容器样式 */
-.chart-svg-container {{
-    width: 100%;
-    height: auto;
-    display: flex;
-    justify-content: center;
-    align-items: center;
-}}
+        return html
 
-.chart-svg-container svg {{
-    max-width: 100%;
-    height: auto;
-}}
-.chart-svg-container img {{
-    max-width: 100%;
-    height: auto;
-}}
+    def _get_font_config(self, font_path: str | None) -> FontConfiguration:
+        """
+        获取本次渲染使用的FontConfiguration
 
-/* 数学公式SVG容器样式 */
-.math-svg-container {{
-    width: 100%;
-    height: auto;
-    display: flex;
-    justify-content: center;
-    align-items: center;
-    margin: 20px 0;
-}}
+        字体文件路径变化（如启用subset_font后每份文档的子集不同）时重建配置，
+        避免旧字体的@font-face与度量缓存残留在新文档中。
+        """
+        if self.font_config is None or font_path != self._font_config_path:
+            self.font_config = FontConfiguration()
+            self._font_config_path = font_path
+        return self.font_config
 
-.math-svg-container svg {{
-    max-width: 100%;
-    height: auto;
-}}
+    def _render(
+        self,
+        document_ir: Dict[str, Any],
+        target: Any = None,
+        optimize_layout: bool = True,
+        save_layout_log: bool = False,
+        pdf_options: Dict[str, Any] | None = None
+    ) -> bytes | None:
+        """
+        生成HTML并交给WeasyPrint输出PDF的统一入口
 
-/* 隐藏原始的math-block（因为已被SVG替换） */
-.math-block {{
-    display: none !important;
-}}
+        参数:
+            document_ir: Document IR数据
+            target: 输出目标（文件路径或文件对象），为None时返回PDF字节
+            optimize_layout: 是否启用布局优化
+            save_layout_log: 是否保存布局优化日志
+            pdf_options: 传给WeasyPrint write_pdf的额外参数，覆盖DEFAULT_PDF_OPTIONS中的同名项
 
-/* 当对应SVG成功注入时隐藏fallback表格，失败时继续显示兜底数据 */
-.chart-fallback.svg-hidden {{
-    display: none !important;
-}}
+        返回:
+            bytes | None: target为None时返回PDF字节，否则返回None
+        """
+        # 生成HTML内容
+        html_content = self._get_pdf_html(document_ir, optimize_layout, save_layout_log)
 
-/* 确保chart-container显示（用于放置SVG） */
-.chart-container {{
-    display: block !important;
-    min-height: 400px;
-}}
+        # 配置字体（字体文件不变时复用实例级FontConfiguration）
+        font_config = self._get_font_config(self._pdf_font_path)
 
-{optimized_css}
-</style>
-"""
+        # 从HTML字符串创建WeasyPrint HTML对象
+        # 直接传入str：WeasyPrint按str解析无需再解码；预先encode为bytes反而多一次编码与字符集探测
+        html_doc = HTML(string=html_content, base_url=str(Path.cwd()))
+        # 解析完成后HTML源码不再需要，提前释放数MB字符串，降低排版阶段的峰值内存
+        del html_content
 
-        # 在</head>前插入PDF专用CSS
-        html = html.replace('</head>', f'{pdf_css}\n</head>')
+        write_options = {
+            'presentational_hints': True,  # 保留HTML的呈现提示
+            **DEFAULT_PDF_OPTIONS,
+            **(pdf_options or {}),
+        }
 
-        return html
+        return html_doc.write_pdf(
+            target=target,
+            font_config=font_config,
+            **write_options
+        )
 
     def render_to_pdf(
         self,
         document_ir: Dict[str, Any],
         output_path: str | Path,
-        optimize_layout: bool = True
+        optimize_layout: bool = True,
+        save_layout_log: bool = False,
+        pdf_options: Dict[str, Any] | None = None
     ) -> Path:
         """
         将Document IR渲染为PDF文件
@@ -1071,6 +1654,8 @@ body {{
             document_ir: Document IR数据
             output_path: PDF输出路径
             optimize_layout: 是否启用布局优化（默认True）
+            save_layout_log: 是否保存布局优化日志（默认False）
+            pdf_options: WeasyPrint输出参数（如optimize_images、jpeg_quality、dpi），默认使用DEFAULT_PDF_OPTIONS
 
         返回:
             Path: 生成的PDF文件路径
@@ -1079,22 +1664,8 @@ body {{
 
         logger.info(f"开始生成PDF: {output_path}")
 
-        # 生成HTML内容
-        html_content = self._get_pdf_html(document_ir, optimize_layout)
-
-        # 配置字体
-        font_config = FontConfiguration()
-
-        # 从HTML字符串创建WeasyPrint HTML对象
-        html_doc = HTML(string=html_content, base_url=str(Path.cwd()))
-
-        # 生成PDF
         try:
-            html_doc.write_pdf(
-                output_path,
-                font_config=font_config,
-                presentational_hints=True  # 保留HTML的呈现提示
-            )
+            self._render(document_ir, str(output_path), optimize_layout, save_layout_log, pdf_options)
             logger.info(f"✓ PDF生成成功: {output_path}")
             return output_path
 
@@ -1105,7 +1676,9 @@ body {{
     def render_to_bytes(
         self,
         document_ir: Dict[str, Any],
-        optimize_layout: bool = True
+        optimize_layout: bool = True,
+        save_layout_log: bool = False,
+        pdf_options: Dict[str, Any] | None = None
     ) -> bytes:
         """
         将Document IR渲染为PDF字节流
@@ -1113,18 +1686,53 @@ body {{
         参数:
             document_ir: Document IR数据
             optimize_layout: 是否启用布局优化（默认True）
+            save_layout_log: 是否保存布局优化日志（默认False）
+            pdf_options: WeasyPrint输出参数（如optimize_images、jpeg_quality、dpi），默认使用DEFAULT_PDF_OPTIONS
 
         返回:
             bytes: PDF文件的字节内容
         """
-        html_content = self._get_pdf_html(document_ir, optimize_layout)
-        font_config = FontConfiguration()
-        html_doc = HTML(string=html_content, base_url=str(Path.cwd()))
+        return self._render(document_ir, None, optimize_layout, save_layout_log, pdf_options)
 
-        return html_doc.write_pdf(
-            font_config=font_config,
-            presentational_hints=True
-        )
+    def render_to_both(
+        self,
+        document_ir: Dict[str, Any],
+        output_path: str | Path,
+        optimize_layout: bool = True,
+        save_layout_log: bool = False,
+        pdf_options: Dict[str, Any] | None = None
+    ) -> bytes:
+        """
+        只渲染一次，同时写入PDF文件并返回字节内容
+
+        适用于既要落盘又要返回给调用方（如Web接口）的场景，避免重复渲染。
+
+        参数:
+            document_ir: Document IR数据
+            output_path: PDF输出路径
+            optimize_layout: 是否启用布局优化（默认True）
+            save_layout_log: 是否保存布局优化日志（默认False）
+            pdf_options: WeasyPrint输出参数（如optimize_images、jpeg_quality、dpi），默认使用DEFAULT_PDF_OPTIONS
+
+        返回:
+            bytes: PDF文件的字节内容
+        """
+        output_path = Path(output_path)
+
+        logger.info(f"开始生成PDF: {output_path}")
+
+        buffer = io.BytesIO()
+        try:
+            self._render(document_ir, buffer, optimize_layout, save_layout_log, pdf_options)
+        except Exception as e:
+            logger.error(f"PDF生成失败: {e}")
+            raise
+
+        pdf_bytes = buffer.getvalue()
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_bytes(pdf_bytes)
+        logger.info(f"✓ PDF生成成功: {output_path}")
+        return pdf_bytes
 
 
 __all__ = ["PDFRenderer"]
@@ -0,0 +1,52 @@
+import re
+import unittest
+
+from ReportEngine.renderers import pdf_renderer
+from ReportEngine.renderers.html_renderer import HTMLRenderer
+from ReportEngine.renderers.pdf_renderer import _base_subset_codepoints, _build_subset_font, _get_font_path
+
+
+def _page_text(markup: str) -> set:
+    """去掉标签后返回页面上可见的非空白字符"""
+    return {ch for ch in re.sub(r"<[^>]+>", "", markup) if not ch.isspace()}
+
+
+class FontSubsetBaseCharsTestCase(unittest.TestCase):
+    """Fixed text written by HTMLRenderer must survive font subsetting."""
+
+    def setUp(self):
+        renderer = HTMLRenderer()
+        # 数据只用ASCII，页面上的中文全部来自HTMLRenderer的固定模板
+        self.fallback_html = "\n".join([
+            renderer._render_widget_fallback(
+                {"labels": ["A", "B"], "datasets": [{"label": "S", "data": [1, 2]}, {"data": [3, 4]}]},
+                "w1",
+            ),
+            renderer._render_wordcloud_fallback({"data": [{"word": "x", "weight": 0.5}]}, "w2"),
+        ])
+
+    def test_fallback_table_text_in_base_set(self):
+        chars = _page_text(self.fallback_html)
+        self.assertTrue({"类", "别", "关", "键", "词", "权", "重"} <= chars)
+        missing = sorted(ch for ch in chars if ord(ch) not in _base_subset_codepoints())
+        self.assertEqual(missing, [])
+
+    @unittest.skipUnless(pdf_renderer.FONTTOOLS_AVAILABLE, "fontTools未安装")
+    def test_fallback_table_text_in_subset_font(self):
+        from fontTools.ttLib import TTFont
+
+        font_path = _get_font_path()
+        subset_path = _build_subset_font({"chapters": []}, font_path)
+        self.assertNotEqual(subset_path, font_path)
+
+        full_cmap = TTFont(str(font_path)).getBestCmap()
+        subset_cmap = TTFont(str(subset_path)).getBestCmap()
+        missing = sorted(
+            ch for ch in _page_text(self.fallback_html)
+            if ord(ch) in full_cmap and ord(ch) not in subset_cmap
+        )
+        self.assertEqual(missing, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import html
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from ReportEngine.renderers import pdf_renderer
+from ReportEngine.renderers.pdf_renderer import (
+    PDFRenderer,
+    _ChartMarkupScanner,
+    _ChartSVGDiskCache,
+)
+
+
+def _chart_markup(widget_id: str, index: int, with_canvas: bool = True, with_config: bool = True) -> str:
+    """按HTMLRenderer的输出格式拼出一个图表的fallback、canvas与配置脚本"""
+    parts = [
+        f'<div class="chart-fallback" data-prebuilt="true" '
+        f'data-widget-id="{html.escape(widget_id, quote=True)}"><table></table></div>'
+    ]
+    if with_canvas:
+        parts.append(f'<canvas id="chart-{index}" data-config-id="chart-config-{index}"></canvas>')
+    if with_config:
+        config_json = json.dumps(
+            {"widgetId": widget_id, "widgetType": "chart.js/bar"}, ensure_ascii=False
+        ).replace("</", "<\\/")
+        parts.append(f'<script type="application/json" id="chart-config-{index}">{config_json}</script>')
+    return "\n".join(parts)
+
+
+class ChartMarkupScannerTestCase(unittest.TestCase):
+    """Single-pass scanner used by SVG injection."""
+
+    def test_collects_entity_escaped_widget_ids(self):
+        widget_id = 'a&b"c'
+        markup = f"<html><body>\n{_chart_markup(widget_id, 1)}\n</body></html>"
+        scanner = _ChartMarkupScanner()
+        scanner.scan(markup)
+
+        self.assertEqual(scanner.widget_configs, {widget_id: "chart-config-1"})
+        start, end = scanner.canvases["chart-config-1"]
+        self.assertEqual(
+            markup[start:end],
+            '<canvas id="chart-1" data-config-id="chart-config-1"></canvas>',
+        )
+        fb_start, fb_end, tag = scanner.fallbacks[widget_id]
+        self.assertEqual(markup[fb_start:fb_end], tag)
+        self.assertIn('data-widget-id="a&amp;b&quot;c"', tag)
+
+    def test_ignores_scripts_without_widget_id(self):
+        markup = '<script type="application/json" id="meta">{"title": "x"}</script>'
+        scanner = _ChartMarkupScanner()
+        scanner.scan(markup)
+        self.assertEqual(scanner.widget_configs, {})
+
+
+class InjectSVGTestCase(unittest.TestCase):
+    """PDFRenderer._inject_svg_into_html with scanner-based offsets."""
+
+    def setUp(self):
+        self.renderer = PDFRenderer.__new__(PDFRenderer)
+
+    def test_replaces_canvas_and_hides_fallback(self):
+        widget_id = 'a&b"c'
+        markup = f"<body>\n{_chart_markup(widget_id, 1)}\n</body>"
+        svg = '<?xml version="1.0"?>\n<svg id="s1"></svg>'
+        result = self.renderer._inject_svg_into_html(markup, {widget_id: svg})
+
+        self.assertIn('<div class="chart-svg-container"><svg id="s1"></svg></div>', result)
+        self.assertNotIn("<canvas", result)
+        self.assertNotIn("<?xml", result)
+        self.assertIn('class="chart-fallback svg-hidden"', result)
+
+    def test_missing_config_leaves_html_unchanged(self):
+        markup = _chart_markup("w1", 1, with_config=False)
+        result = self.renderer._inject_svg_into_html(markup, {"w1": "<svg></svg>"})
+        self.assertEqual(result, markup)
+
+    def test_missing_canvas_still_hides_fallback(self):
+        markup = _chart_markup("w1", 1, with_canvas=False)
+        result = self.renderer._inject_svg_into_html(markup, {"w1": "<svg></svg>"})
+        self.assertNotIn("chart-svg-container", result)
+        self.assertIn('class="chart-fallback svg-hidden"', result)
+
+    def test_only_matching_widgets_are_touched(self):
+        markup = "\n".join([_chart_markup("w1", 1), _chart_markup("w10", 2)])
+        result = self.renderer._inject_svg_into_html(markup, {"w1": "<svg></svg>"})
+        self.assertEqual(result.count("chart-svg-container"), 1)
+        self.assertIn('data-config-id="chart-config-2"', result)
+        self.assertEqual(result.count("svg-hidden"), 1)
+
+
+class InjectWordcloudTestCase(unittest.TestCase):
+    """PDFRenderer._inject_wordcloud_images on top of the shared markup scanner."""
+
+    def setUp(self):
+        self.renderer = PDFRenderer.__new__(PDFRenderer)
+        self.image = "data:image/png;base64,AA=="
+
+    def test_escaped_widget_id_is_injected(self):
+        widget_id = 'a&b"c</x>'
+        markup = _chart_markup(widget_id, 1)
+        result = self.renderer._inject_wordcloud_images(markup, {widget_id: self.image})
+
+        self.assertIn(f'<img src="{self.image}" alt="词云" />', result)
+        self.assertNotIn("<canvas", result)
+        self.assertIn('class="chart-fallback svg-hidden"', result)
+
+    def test_missing_config_leaves_html_unchanged(self):
+        markup = _chart_markup("w1", 1, with_config=False)
+        result = self.renderer._inject_wordcloud_images(markup, {"w1": self.image})
+        self.assertEqual(result, markup)
+
+    def test_missing_canvas_still_hides_fallback(self):
+        markup = _chart_markup("w1", 1, with_canvas=False)
+        result = self.renderer._inject_wordcloud_images(markup, {"w1": self.image})
+        self.assertNotIn("wordcloud-img", result)
+        self.assertIn('class="chart-fallback svg-hidden"', result)
+
+    def test_prefix_ids_do_not_cross_match(self):
+        markup = "\n".join([_chart_markup("w10", 1), _chart_markup("w1", 2)])
+        result = self.renderer._inject_wordcloud_images(markup, {"w1": self.image})
+        self.assertIn('data-config-id="chart-config-1"', result)
+        self.assertNotIn('data-config-id="chart-config-2"', result)
+        self.assertEqual(result.count("svg-hidden"), 1)
+        self.assertIn('class="chart-fallback" data-prebuilt="true" data-widget-id="w10"', result)
+
+
+class ChartSVGDiskCacheTestCase(unittest.TestCase):
+    """On-disk chart SVG cache keyed by block, converter version and font."""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmpdir.name)
+        self.block = {"type": "widget", "widgetId": "w1", "data": {"labels": ["一", "二"]}}
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_put_then_get_round_trips(self):
+        cache = _ChartSVGDiskCache(self.cache_dir)
+        key = cache.make_key(self.block)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "<svg>一</svg>")
+        self.assertEqual(cache.get(key), "<svg>一</svg>")
+        self.assertEqual(list(self.cache_dir.glob("*.tmp")), [])
+
+    def test_key_depends_on_font_and_converter_version(self):
+        key = _ChartSVGDiskCache(self.cache_dir, font_path="/fonts/a.otf").make_key(self.block)
+        other_font = _ChartSVGDiskCache(self.cache_dir, font_path="/fonts/b.otf").make_key(self.block)
+        self.assertNotEqual(key, other_font)
+
+        with mock.patch.object(pdf_renderer, "_chart_converter_version", return_value="changed"):
+            other_version = _ChartSVGDiskCache(self.cache_dir, font_path="/fonts/a.otf").make_key(self.block)
+        self.assertNotEqual(key, other_version)
+
+    def test_evict_removes_oldest_entries_first(self):
+        cache = _ChartSVGDiskCache(self.cache_dir, max_bytes=250)
+        for index in range(4):
+            cache.put(f"k{index}", "x" * 100)
+            path = self.cache_dir / f"k{index}.svg"
+            os.utime(path, (1000 + index, 1000 + index))
+
+        cache.evict()
+        remaining = sorted(path.name for path in self.cache_dir.glob("*.svg"))
+        self.assertEqual(remaining, ["k2.svg", "k3.svg"])
+
+
+if __name__ == "__main__":
+    unittest.main()